@@ -1,7 +1,12 @@
 import cv2
 import numpy as np
 import time
-import HandTrackingModule as htm
+import argparse
+import OutputModule as om
+from FramePoolModule import FramePool
+from StrokeModule import StrokeBuilder
+import QualityControlModule as qcm
+import HandTrackingDaemon as htd
 import math
 
 # Canvas settings
@@ -14,24 +19,43 @@ colors = [(255, 0, 255), (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (
 colorNames = ["Magenta", "Red", "Green", "Blue", "Yellow", "Cyan"]
 drawColor = (255, 0, 255)  # Default magenta
 
-# Initialize
-cap = cv2.VideoCapture(0)
-cap.set(3, wCam)
-cap.set(4, hCam)
-
-detector = htm.handDetector(detectionCon=0.75, maxHands=1)
-imgCanvas = np.zeros((hCam, wCam, 3), np.uint8)
+instructions = [
+    "Gestures:",
+    "Index up: Draw",
+    "Index+Middle: Select",
+    "Thumb+Index: Thickness",
+    "Index+Middle+Ring: Color",
+    "Index+Pinky: Erase",
+    "All fingers: Clear"
+]
 
 class AirPaint:
-    def __init__(self):
+    """
+    App state and logic, independent of the camera and window.
+    update() applies one frame of hand input, render() draws the current
+    state onto a camera frame.
+    """
+    def __init__(self, pool=None, width=wCam, height=hCam):
+        # All per-frame images live in the pool so the loop doesn't allocate
+        self.pool = pool if pool is not None else FramePool()
+        self.width, self.height = width, height
+        self.canvas = self.pool.zeros('canvas', (height, width, 3))
+        self.indicator = None  # what to draw at the fingertip this frame
+        self.now = time.time()
         self.mode = "drawing"
         self.colorIndex = 0
         self.thickness = brushThickness
         self.lastColorChange = 0
         self.lastThicknessChange = 0
         self.lastModeChange = 0
-        self.smoothing_factor = 0.7  # For smooth drawing
-        self.xp, self.yp = 0, 0  # Previous finger positions
+        # Spline strokes from timestamped samples, so drawings look the same
+        # at any detection rate
+        self.stroke = StrokeBuilder(self.canvas, colors[self.colorIndex], self.thickness)
+        self.xp, self.yp = 0, 0  # Previous finger positions (eraser)
+        
+    def clear(self):
+        self.stroke.end()
+        self.canvas.fill(0)
         
     def draw_header(self, img):
         """Draw the header with color palette and current settings"""
@@ -58,7 +82,7 @@ class AirPaint:
         
     def get_gesture_action(self, fingers, lmList):
         """Determine action based on finger gestures"""
-        current_time = time.time()
+        current_time = self.now
         
         if len(lmList) == 0:
             return "none"
@@ -104,12 +128,12 @@ class AirPaint:
             length = math.hypot(x2 - x1, y2 - y1)
             # Map distance to thickness (20-150 pixels distance -> 5-50 thickness)
             self.thickness = int(np.interp(length, [20, 150], [5, 50]))
-            self.lastThicknessChange = time.time()
+            self.lastThicknessChange = self.now
             
             return x1, y1, x2, y2, length
         return None
     
-    def handle_color_selection(self, lmList, img):
+    def handle_color_selection(self, lmList):
         """Handle color selection when in header area"""
         if len(lmList) >= 9:
             x, y = lmList[8][1], lmList[8][2]  # Index finger tip
@@ -120,13 +144,13 @@ class AirPaint:
                 for i in range(len(colors)):
                     if 50 + i * 100 < x < 150 + i * 100:
                         self.colorIndex = i
-                        self.lastColorChange = time.time()
+                        self.lastColorChange = self.now
                         return True
                 
                 # Check eraser button
                 if 700 < x < 800:
                     self.mode = "eraser"
-                    self.lastModeChange = time.time()
+                    self.lastModeChange = self.now
                     return True
                 
                 # Check clear button
@@ -134,155 +158,203 @@ class AirPaint:
                     return "clear"
                     
         return False
-
-def main():
-    global imgCanvas
-    air_paint = AirPaint()
-    pTime = 0
     
-    while True:
-        success, img = cap.read()
-        img = cv2.flip(img, 1)  # Flip for mirror effect
-        
-        # Find hands
-        img = detector.findHands(img, draw=False)
-        lmList = detector.findPosition(img)
-        
-        if len(lmList) != 0:
-            # Get finger positions
-            try:
-                fingers = detector.getFingers(img)
-                
-                # Get current action based on gestures
-                action = air_paint.get_gesture_action(fingers, lmList)
-                
-                # Handle different actions
-                if action == "drawing":
-                    air_paint.mode = "drawing"
-                    x1, y1 = lmList[8][1], lmList[8][2]  # Index finger tip
-                    
-                    # Smooth drawing
-                    if air_paint.xp == 0 and air_paint.yp == 0:
-                        air_paint.xp, air_paint.yp = x1, y1
-                    
-                    # Apply smoothing
-                    smooth_x = int(air_paint.smoothing_factor * air_paint.xp + (1 - air_paint.smoothing_factor) * x1)
-                    smooth_y = int(air_paint.smoothing_factor * air_paint.yp + (1 - air_paint.smoothing_factor) * y1)
-                    
-                    # Draw on canvas (only if not in header area)
-                    if y1 > 120:
-                        cv2.line(img, (air_paint.xp, air_paint.yp), (smooth_x, smooth_y), colors[air_paint.colorIndex], air_paint.thickness)
-                        cv2.line(imgCanvas, (air_paint.xp, air_paint.yp), (smooth_x, smooth_y), colors[air_paint.colorIndex], air_paint.thickness)
-                    
-                    air_paint.xp, air_paint.yp = smooth_x, smooth_y
-                    
-                    # Draw finger indicator
-                    cv2.circle(img, (x1, y1), 15, colors[air_paint.colorIndex], cv2.FILLED)
-                
-                elif action == "eraser":
-                    air_paint.mode = "eraser"
-                    x1, y1 = lmList[8][1], lmList[8][2]  # Index finger tip
-                    
-                    if air_paint.xp == 0 and air_paint.yp == 0:
-                        air_paint.xp, air_paint.yp = x1, y1
-                    
-                    # Erase on canvas (only if not in header area)
-                    if y1 > 120:
-                        cv2.line(img, (air_paint.xp, air_paint.yp), (x1, y1), (0, 0, 0), eraserThickness)
-                        cv2.line(imgCanvas, (air_paint.xp, air_paint.yp), (x1, y1), (0, 0, 0), eraserThickness)
-                    
-                    air_paint.xp, air_paint.yp = x1, y1
-                    
-                    # Draw eraser indicator
-                    cv2.circle(img, (x1, y1), eraserThickness//2, (0, 0, 0), 2)
-                
-                elif action == "thickness":
-                    air_paint.mode = "thickness_control"
-                    thickness_data = air_paint.handle_thickness_control(lmList)
-                    if thickness_data:
-                        x1, y1, x2, y2, length = thickness_data
-                        # Draw thickness control visualization
-                        cv2.line(img, (x1, y1), (x2, y2), (255, 255, 255), 3)
-                        cv2.circle(img, (x1, y1), 10, (255, 255, 255), cv2.FILLED)
-                        cv2.circle(img, (x2, y2), 10, (255, 255, 255), cv2.FILLED)
-                        cv2.putText(img, f"Thickness: {air_paint.thickness}", (x1-50, y1-30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                    air_paint.xp, air_paint.yp = 0, 0
-                
-                elif action == "color_change":
-                    air_paint.colorIndex = (air_paint.colorIndex + 1) % len(colors)
-                    air_paint.lastColorChange = time.time()
-                    air_paint.mode = "color_changed"
-                    air_paint.xp, air_paint.yp = 0, 0
-                
-                elif action == "clear":
-                    imgCanvas = np.zeros((hCam, wCam, 3), np.uint8)
-                    air_paint.lastModeChange = time.time()
-                    air_paint.mode = "cleared"
-                    air_paint.xp, air_paint.yp = 0, 0
-                
-                elif action == "selection":
-                    # Check if finger is in header for color selection
-                    header_action = air_paint.handle_color_selection(lmList, img)
-                    if header_action == "clear":
-                        imgCanvas = np.zeros((hCam, wCam, 3), np.uint8)
-                        air_paint.mode = "cleared"
-                    elif header_action:
-                        air_paint.mode = "color_selected"
-                    else:
-                        air_paint.mode = "selection"
-                    air_paint.xp, air_paint.yp = 0, 0
-                
+    def update(self, lmList, fingers, now=None):
+        """Apply one frame of hand input: gestures, settings and strokes on the canvas"""
+        self.now = time.time() if now is None else now
+        self.indicator = None
+
+        if len(lmList) == 0:
+            self.stroke.end()
+            self.xp, self.yp = 0, 0
+            return
+
+        try:
+            # Get current action based on gestures
+            action = self.get_gesture_action(fingers, lmList)
+            if action != "drawing":
+                self.stroke.end()
+
+            # Handle different actions
+            if action == "drawing":
+                self.mode = "drawing"
+                x1, y1 = lmList[8][1], lmList[8][2]  # Index finger tip
+
+                # Draw on canvas (only if not in header area)
+                if y1 > 120:
+                    self.stroke.color = colors[self.colorIndex]
+                    self.stroke.thickness = self.thickness
+                    self.stroke.add(x1, y1, self.now)
                 else:
-                    air_paint.xp, air_paint.yp = 0, 0
-                    
-            except Exception as e:
-                air_paint.xp, air_paint.yp = 0, 0
-        else:
-            air_paint.xp, air_paint.yp = 0, 0
-        
+                    self.stroke.end()
+
+                self.xp, self.yp = 0, 0
+                self.indicator = ("drawing", (x1, y1))
+
+            elif action == "eraser":
+                self.mode = "eraser"
+                x1, y1 = lmList[8][1], lmList[8][2]  # Index finger tip
+
+                if self.xp == 0 and self.yp == 0:
+                    self.xp, self.yp = x1, y1
+
+                # Erase on canvas (only if not in header area)
+                if y1 > 120:
+                    cv2.line(self.canvas, (self.xp, self.yp), (x1, y1), (0, 0, 0), eraserThickness)
+
+                self.xp, self.yp = x1, y1
+                self.indicator = ("eraser", (x1, y1))
+
+            elif action == "thickness":
+                self.mode = "thickness_control"
+                thickness_data = self.handle_thickness_control(lmList)
+                if thickness_data:
+                    self.indicator = ("thickness", thickness_data)
+                self.xp, self.yp = 0, 0
+
+            elif action == "color_change":
+                self.colorIndex = (self.colorIndex + 1) % len(colors)
+                self.lastColorChange = self.now
+                self.mode = "color_changed"
+                self.xp, self.yp = 0, 0
+
+            elif action == "clear":
+                self.clear()
+                self.lastModeChange = self.now
+                self.mode = "cleared"
+                self.xp, self.yp = 0, 0
+
+            elif action == "selection":
+                # Check if finger is in header for color selection
+                header_action = self.handle_color_selection(lmList)
+                if header_action == "clear":
+                    self.clear()
+                    self.mode = "cleared"
+                elif header_action:
+                    self.mode = "color_selected"
+                else:
+                    self.mode = "selection"
+                self.xp, self.yp = 0, 0
+
+            else:
+                self.xp, self.yp = 0, 0
+
+        except Exception as e:
+            self.stroke.end()
+            self.xp, self.yp = 0, 0
+
+    def render(self, img):
+        """Composite the canvas, cursor and UI onto the camera frame (in place)"""
+        if img.shape[:2] != self.canvas.shape[:2]:
+            raise ValueError(f"Frame is {img.shape[1]}x{img.shape[0]} but the canvas is "
+                             f"{self.width}x{self.height}; create AirPaint with the frame size")
         # Merge canvas with camera image
-        imgGray = cv2.cvtColor(imgCanvas, cv2.COLOR_BGR2GRAY)
-        _, imgInv = cv2.threshold(imgGray, 50, 255, cv2.THRESH_BINARY_INV)
-        imgInv = cv2.cvtColor(imgInv, cv2.COLOR_GRAY2BGR)
-        img = cv2.bitwise_and(img, imgInv)
-        img = cv2.bitwise_or(img, imgCanvas)
-        
+        pool = self.pool
+        imgGray = cv2.cvtColor(self.canvas, cv2.COLOR_BGR2GRAY, dst=pool.get('gray', self.canvas.shape[:2]))
+        cv2.threshold(imgGray, 50, 255, cv2.THRESH_BINARY_INV, dst=imgGray)
+        imgInv = cv2.cvtColor(imgGray, cv2.COLOR_GRAY2BGR, dst=pool.get('inv', self.canvas.shape))
+        cv2.bitwise_and(img, imgInv, dst=img)
+        cv2.bitwise_or(img, self.canvas, dst=img)
+        self.stroke.drawPreview(img)
+
+        if self.indicator:
+            kind, data = self.indicator
+            if kind == "drawing":
+                # Draw finger indicator
+                cv2.circle(img, data, 15, colors[self.colorIndex], cv2.FILLED)
+            elif kind == "eraser":
+                # Draw eraser indicator
+                cv2.circle(img, data, eraserThickness//2, (0, 0, 0), 2)
+            elif kind == "thickness":
+                x1, y1, x2, y2, length = data
+                # Draw thickness control visualization
+                cv2.line(img, (x1, y1), (x2, y2), (255, 255, 255), 3)
+                cv2.circle(img, (x1, y1), 10, (255, 255, 255), cv2.FILLED)
+                cv2.circle(img, (x2, y2), 10, (255, 255, 255), cv2.FILLED)
+                cv2.putText(img, f"Thickness: {self.thickness}", (x1-50, y1-30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
         # Draw header
-        air_paint.draw_header(img)
-        
+        self.draw_header(img)
+
         # Draw instructions
-        instructions = [
-            "Gestures:",
-            "Index up: Draw",
-            "Index+Middle: Select",
-            "Thumb+Index: Thickness",
-            "Index+Middle+Ring: Color",
-            "Index+Pinky: Erase",
-            "All fingers: Clear"
-        ]
-        
         for i, instruction in enumerate(instructions):
-            cv2.putText(img, instruction, (wCam - 300, 150 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
-        # FPS
-        cTime = time.time()
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-        cv2.putText(img, f'FPS: {int(fps)}', (10, hCam - 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        
-        cv2.imshow("Air Paint", img)
-        
-        key = cv2.waitKey(1) & 0xFF
-        if key == 27:  # ESC key
-            break
-        elif key == ord('c'):  # Clear canvas
-            imgCanvas = np.zeros((hCam, wCam, 3), np.uint8)
-        elif key == ord('s'):  # Save canvas
-            cv2.imwrite(f"air_paint_{int(time.time())}.jpg", imgCanvas)
-            print("Canvas saved!")
-
-    cap.release()
-    cv2.destroyAllWindows()
+            cv2.putText(img, instruction, (self.width - 300, 150 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+        return img
+
+def main():
+    parser = argparse.ArgumentParser(description="Air Paint")
+    om.addOutputArgs(parser)
+    qcm.addQualityArgs(parser)
+    htd.addSourceArgs(parser)
+    args = parser.parse_args()
+
+    pool = FramePool()
+    cap, detector = htd.openSource(args, wCam, hCam, pool, flip=True, detectionCon=0.75, maxHands=1)
+    sink = om.createSink(args.output, "Air Paint", pool)
+    # With --daemon, inference quality is up to the daemon
+    quality = None if args.daemon else qcm.createController(detector, args.target_ms)
+    # The camera or daemon may not deliver the requested size; the canvas
+    # has to match what actually arrives
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or wCam
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or hCam
+    air_paint = AirPaint(pool, width, height)
+    if detector.smoothing:
+        # Landmarks are already One-Euro filtered; don't add more lag
+        air_paint.stroke.smoothingTime = 0
+    pTime = 0
+    frameCount = 0
+
+    try:
+        while True:
+            success, frame = pool.read(cap)
+            if not success:
+                break
+            # Stroke knots and the landmark filter run on capture times, not processing times
+            frameTime = htd.captureTime(cap)
+            if quality:
+                quality.startFrame()
+            img = cv2.flip(frame, 1, dst=pool.get('flip', frame.shape))  # Flip for mirror effect
+
+            # Find hands
+            img = detector.findHands(img, draw=False, timestamp=frameTime)
+            lmList = detector.findPosition(img)
+            fingers = detector.getFingers(img) if lmList else None
+
+            air_paint.update(lmList, fingers, frameTime)
+            air_paint.render(img)
+
+            # FPS
+            cTime = time.time()
+            fps = 1 / (cTime - pTime)
+            pTime = cTime
+            cv2.putText(img, f'FPS: {int(fps)}', (10, height - 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            if quality:
+                # Frames the motion gate skipped say nothing about inference cost
+                if detector.ranInference:
+                    quality.endFrame()
+                cv2.putText(img, quality.describe(), (180, height - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+            key = sink.show(img)
+            frameCount += 1
+            if args.frames and frameCount >= args.frames:
+                break
+
+            if key == 27:  # ESC key
+                break
+            elif key == ord('c'):  # Clear canvas
+                air_paint.clear()
+            elif key == ord('s'):  # Save canvas
+                cv2.imwrite(f"air_paint_{int(time.time())}.jpg", air_paint.canvas)
+                print("Canvas saved!")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        sink.release()
+    print(f"Frame pool: {pool.stats()}")
+    if detector.motionGate:
+        print(f"Motion gate: {detector.motionGate.stats()}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,268 @@
+"""
+Frame budget benchmark for the app cores.
+
+Drives AirPaint, NinjaFruit and VolumeControl with synthetic camera frames
+and either synthetic or recorded landmarks, without a camera, MediaPipe or a
+window. Reports per-frame update and render cost and per-frame allocations,
+and exits with status 1 when a budget is exceeded:
+
+    python FrameBudgetBenchmark.py --budget-ms 8 --alloc-budget-kb 64
+    python FrameBudgetBenchmark.py --record session.json --frames 300
+    python FrameBudgetBenchmark.py --landmarks session.json
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+import HandTrackingModule as htm
+from FramePoolModule import FramePool
+import AirPaint
+import NinjaFruit
+import VolumeHandControl
+
+
+WARMUP_FRAMES = 10
+
+# Gesture schedule for synthetic sessions: (frames, fingers); None = no hand
+GESTURES = [
+    (40, None),
+    (120, [0, 1, 0, 0, 0]),   # draw / slice
+    (30, [0, 1, 1, 0, 0]),    # select
+    (30, [1, 1, 0, 0, 0]),    # thickness / pinch
+    (40, [0, 1, 0, 0, 1]),    # erase
+    (20, [0, 1, 1, 1, 0]),    # color change
+    (20, [1, 1, 1, 1, 1]),    # clear
+]
+
+
+def syntheticHand(cx, cy, fingers, size = 100):
+    """
+    Build a findPosition()-style landmark list for a right hand (as seen in
+    the mirrored frame) with the given finger states, palm centred at (cx, cy).
+    fingersUp() on the result returns `fingers`.
+    """
+    s = size / 100.0
+    pts = [(0, 60)]  # wrist
+    # Thumb: CMC, MCP, IP, tip; extended outward (+x) when up
+    if fingers[0]:
+        pts += [(25, 45), (45, 30), (60, 15), (75, 5)]
+    else:
+        pts += [(20, 45), (30, 30), (30, 15), (20, 10)]
+    # Index..pinky: MCP, PIP, DIP, tip; tip above the PIP joint when up
+    for i, baseX in enumerate([20, 0, -20, -40]):
+        if fingers[i + 1]:
+            pts += [(baseX, 0), (baseX, -35), (baseX, -55), (baseX, -75)]
+        else:
+            pts += [(baseX, 0), (baseX, -30), (baseX, -15), (baseX, 0)]
+    return [[id, int(cx + x * s), int(cy + y * s)] for id, (x, y) in enumerate(pts)]
+
+
+def syntheticSession(frames, width, height, fps = 30):
+    """(timestamp, lmList) pairs for a hand moving on a Lissajous path through GESTURES"""
+    session = []
+    schedule = []
+    for count, fingers in GESTURES:
+        schedule += [fingers] * count
+    for i in range(frames):
+        t = i / fps
+        fingers = schedule[i % len(schedule)]
+        if fingers is None:
+            session.append((t, []))
+            continue
+        cx = width * (0.5 + 0.3 * math.sin(t * 1.3))
+        cy = height * (0.6 + 0.2 * math.sin(t * 2.1))
+        size = min(width, height) / 5
+        session.append((t, syntheticHand(cx, cy, fingers, size)))
+    return session
+
+
+def loadRecording(path, width, height):
+    """Recorded session rescaled to the app resolution"""
+    with open(path) as f:
+        data = json.load(f)
+    sx, sy = width / data['width'], height / data['height']
+    return [(frame['t'], [[id, int(x * sx), int(y * sy)] for id, x, y in frame['lmList']])
+            for frame in data['frames']]
+
+
+def record(path, frames, width = 640, height = 480):
+    """Capture a landmark session from the camera (mirrored, like the apps)"""
+    import cv2
+    pool = FramePool()
+    cap = cv2.VideoCapture(0)
+    cap.set(3, width)
+    cap.set(4, height)
+    detector = htm.handDetector(detectionCon=0.75, pool=pool)
+    recorded = []
+    start = time.time()
+    print(f"Recording {frames} frames...")
+    while len(recorded) < frames:
+        success, frame = pool.read(cap)
+        if not success:
+            break
+        img = cv2.flip(frame, 1, dst=pool.get('flip', frame.shape))
+        detector.findHands(img, draw=False)
+        recorded.append({'t': time.time() - start, 'lmList': detector.findPosition(img)})
+    cap.release()
+    h, w = img.shape[:2]
+    with open(path, 'w') as f:
+        json.dump({'width': w, 'height': h, 'frames': recorded}, f)
+    print(f"Saved {len(recorded)} frames to {path}")
+
+
+class AirPaintBench:
+    name = 'AirPaint'
+    width, height = AirPaint.wCam, AirPaint.hCam
+
+    def __init__(self, pool):
+        self.app = AirPaint.AirPaint(pool)
+
+    def update(self, lmList, t):
+        self.app.update(lmList, htm.fingersUp(lmList), now=t)
+
+    def render(self, img):
+        self.app.render(img)
+
+
+class NinjaFruitBench:
+    name = 'NinjaFruit'
+    width, height = NinjaFruit.wCam, NinjaFruit.hCam
+
+    def __init__(self, pool):
+        random.seed(0)
+        self.game = NinjaFruit.Game(high_score_file=None)
+        self.tip = None
+
+    def update(self, lmList, t):
+        self.tip = (lmList[8][1], lmList[8][2]) if len(lmList) > 8 else None
+        self.game.update(self.tip)
+        # Keep the benchmark in the PLAYING state instead of sitting on menus
+        if self.game.state == NinjaFruit.GAME_OVER:
+            self.game.reset_game()
+
+    def render(self, img):
+        self.game.render(img, self.tip)
+
+
+class VolumeBench:
+    name = 'VolumeHandControl'
+    width, height = VolumeHandControl.wCam, VolumeHandControl.hCam
+
+    def __init__(self, pool):
+        self.control = VolumeHandControl.VolumeControl()
+
+    def update(self, lmList, t):
+        self.control.update(lmList)
+
+    def render(self, img):
+        self.control.render(img)
+
+
+BENCHES = {'airpaint': AirPaintBench, 'ninjafruit': NinjaFruitBench, 'volume': VolumeBench}
+
+
+def syntheticFrame(width, height):
+    """Deterministic camera-like frame: smooth gradient plus sensor noise"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // max(1, width - 1), y * 255 // max(1, height - 1),
+                     np.full_like(x, 96)], axis=-1)
+    noise = rng.integers(0, 24, (height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def runBench(benchClass, session):
+    pool = FramePool()
+    bench = benchClass(pool)
+    camera = syntheticFrame(bench.width, bench.height)
+    img = pool.get('capture', camera.shape)
+
+    # Timing pass
+    updateMs, renderMs = [], []
+    for i, (t, lmList) in enumerate(session):
+        np.copyto(img, camera)  # stands in for cap.read()
+        t0 = time.perf_counter()
+        bench.update(lmList, t)
+        t1 = time.perf_counter()
+        bench.render(img)
+        t2 = time.perf_counter()
+        if i >= WARMUP_FRAMES:
+            updateMs.append((t1 - t0) * 1000)
+            renderMs.append((t2 - t1) * 1000)
+
+    # Allocation pass: tracemalloc slows everything down, so it runs separately
+    pool = FramePool()
+    bench = benchClass(pool)
+    img = pool.get('capture', camera.shape)
+    allocKb = []
+    poolAllocs = 0
+    tracemalloc.start()
+    for i, (t, lmList) in enumerate(session):
+        np.copyto(img, camera)
+        if i == WARMUP_FRAMES:
+            poolAllocs = pool.allocations
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        bench.update(lmList, t)
+        bench.render(img)
+        peak = tracemalloc.get_traced_memory()[1]
+        if i >= WARMUP_FRAMES:
+            allocKb.append((peak - before) / 1024)
+    tracemalloc.stop()
+
+    totalMs = np.add(updateMs, renderMs)
+    return {
+        'name': bench.name,
+        'frames': len(totalMs),
+        'updateMs': float(np.mean(updateMs)),
+        'renderMs': float(np.mean(renderMs)),
+        'p95Ms': float(np.percentile(totalMs, 95)),
+        'maxMs': float(np.max(totalMs)),
+        'allocKb': float(np.max(allocKb)),
+        'poolAllocs': pool.allocations - poolAllocs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame budget benchmark for the app cores")
+    parser.add_argument('--apps', nargs='+', choices=sorted(BENCHES), default=sorted(BENCHES))
+    parser.add_argument('--frames', type=int, default=300, help="synthetic frames per app")
+    parser.add_argument('--landmarks', help="replay a session recorded with --record instead of synthetic landmarks")
+    parser.add_argument('--record', metavar='FILE', help="record a landmark session from the camera and exit")
+    parser.add_argument('--budget-ms', type=float, default=8.0,
+                        help="fail if the 95th percentile update+render time exceeds this")
+    parser.add_argument('--alloc-budget-kb', type=float, default=0,
+                        help="fail if any frame's peak allocation exceeds this (0 = report only)")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.frames)
+        return 0
+
+    print(f"{'App':<18}{'update ms':>10}{'render ms':>10}{'p95 ms':>9}{'max ms':>9}{'alloc KB':>10}{'pool':>6}")
+    failed = []
+    for key in args.apps:
+        benchClass = BENCHES[key]
+        if args.landmarks:
+            session = loadRecording(args.landmarks, benchClass.width, benchClass.height)
+        else:
+            session = syntheticSession(args.frames, benchClass.width, benchClass.height)
+        r = runBench(benchClass, session)
+        print(f"{r['name']:<18}{r['updateMs']:>10.3f}{r['renderMs']:>10.3f}{r['p95Ms']:>9.3f}"
+              f"{r['maxMs']:>9.3f}{r['allocKb']:>10.1f}{r['poolAllocs']:>6}")
+        if r['p95Ms'] > args.budget_ms:
+            failed.append(f"{r['name']}: p95 {r['p95Ms']:.2f} ms > {args.budget_ms} ms")
+        if args.alloc_budget_kb and r['allocKb'] > args.alloc_budget_kb:
+            failed.append(f"{r['name']}: {r['allocKb']:.0f} KB allocated in one frame > {args.alloc_budget_kb} KB")
+
+    for failure in failed:
+        print(f"BUDGET EXCEEDED  {failure}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+class FramePool():
+    """
+    Named, preallocated frame buffers.
+    Each processing step asks for its buffer by name and writes into it with
+    dst=..., so after the first frame the loop stops allocating images.
+    `allocations` counts every buffer the pool had to create; it should stop
+    growing once the loop reaches steady state.
+    """
+    def __init__(self):
+        self.buffers = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Return the buffer called name, (re)allocating only if its shape/dtype changed"""
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self.buffers[name] = buf
+            self.allocations += 1
+        return buf
+
+    def zeros(self, name, shape, dtype=np.uint8):
+        """Like get(), but cleared to zero in place"""
+        buf = self.get(name, shape, dtype)
+        buf.fill(0)
+        return buf
+
+    def read(self, cap, name='capture'):
+        """cap.read() into a pooled buffer; OpenCV only reallocates if the frame size changes"""
+        buf = self.buffers.get(name)
+        success, img = cap.read(buf)
+        if success and img is not buf:
+            self.buffers[name] = img
+            self.allocations += 1
+        return success, img
+
+    def stats(self):
+        nbytes = sum(buf.nbytes for buf in self.buffers.values())
+        return f"{len(self.buffers)} buffers, {nbytes / 1e6:.1f} MB, {self.allocations} allocations"
@@ -0,0 +1,381 @@
+"""
+Shared hand tracking: one process owns the camera and MediaPipe, and
+publishes every frame plus its landmarks to a shared memory segment.
+Apps attach with HandClient and use RemoteHandDetector in place of
+handDetector, so several of them can share one camera and one inference.
+
+Segment layout:
+  header     int64[16]     seq, width, height, numHands, captureTimeNs, maxHands,
+                           then the detector settings: mode, modelComplexity,
+                           detectionCon, trackCon, inferenceScale (floats in
+                           millionths)
+  landmarks  float32[maxHands, 21, 3]   normalized x, y, z
+  handedness float32[maxHands, 2]       label (0=Left, 1=Right), score
+  frame      uint8[height, width, 3]    BGR camera frame
+
+seq works as a seqlock: it is odd while the daemon is writing and even
+once a frame is complete. Readers retry if it was odd or changed while
+they copied.
+"""
+import cv2 as cv
+import numpy as np
+import time
+import argparse
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import HandTrackingModule as htm
+from FramePoolModule import FramePool
+
+
+DEFAULT_NAME = 'hand_tracking'
+NUM_LANDMARKS = 21
+HEADER_FIELDS = 16
+(SEQ, WIDTH, HEIGHT, NUM_HANDS, TIMESTAMP, MAX_HANDS,
+ MODE, MODEL_COMPLEXITY, DETECTION_CON, TRACK_CON, INFERENCE_SCALE) = range(11)
+FIXED_POINT = 1000000  # float header fields are stored as integer millionths
+
+
+def _segmentSize(width, height, maxHands):
+    return (HEADER_FIELDS * 8
+            + maxHands * NUM_LANDMARKS * 3 * 4
+            + maxHands * 2 * 4
+            + width * height * 3)
+
+
+def _views(buf, width, height, maxHands):
+    """numpy views onto the segment (header, landmarks, handedness, frame)"""
+    offset = 0
+    header = np.ndarray((HEADER_FIELDS,), np.int64, buf, offset)
+    offset += HEADER_FIELDS * 8
+    landmarks = np.ndarray((maxHands, NUM_LANDMARKS, 3), np.float32, buf, offset)
+    offset += landmarks.nbytes
+    handedness = np.ndarray((maxHands, 2), np.float32, buf, offset)
+    offset += handedness.nbytes
+    frame = np.ndarray((height, width, 3), np.uint8, buf, offset)
+    return header, landmarks, handedness, frame
+
+
+def _attach(name):
+    """Attach to an existing segment without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment with the resource tracker
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+
+def _isPublishing(name, wait = 1.0):
+    """True if a live daemon owns the segment: its seq keeps advancing"""
+    try:
+        shm = _attach(name)
+    except FileNotFoundError:
+        return False
+    try:
+        if shm.size < HEADER_FIELDS * 8:
+            return False
+        header = np.ndarray((HEADER_FIELDS,), np.int64, shm.buf, 0)
+        seq = int(header[SEQ])
+        deadline = time.time() + wait
+        while time.time() < deadline:
+            time.sleep(0.01)
+            if int(header[SEQ]) != seq:
+                return True
+        return False
+    finally:
+        header = None
+        shm.close()
+
+
+class HandTrackingDaemon():
+    """Owns the camera and the detector, and publishes results to shared memory"""
+    def __init__(self, name = DEFAULT_NAME, camera = 0, width = 640, height = 480, **detectorArgs):
+        self.name = name
+        self.pool = FramePool()
+        self.cap = cv.VideoCapture(camera)
+        self.cap.set(3, width)
+        self.cap.set(4, height)
+        self.detector = htm.handDetector(pool=self.pool, **detectorArgs)
+        self.maxHands = self.detector.maxHands
+        self.shm = None
+        self.seq = 0
+
+    def _create(self, width, height):
+        if _isPublishing(self.name):
+            raise RuntimeError(f"Another hand tracking daemon is already publishing on '{self.name}'")
+        try:
+            # Left behind by a daemon that didn't shut down cleanly
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True,
+                                              size=_segmentSize(width, height, self.maxHands))
+        self.header, self.landmarks, self.handedness, self.frame = _views(self.shm.buf, width, height, self.maxHands)
+        self.header[:] = 0
+        # Settings first: clients take a nonzero width to mean the header is ready
+        detector = self.detector
+        self.header[MODE] = int(detector.mode)
+        self.header[MODEL_COMPLEXITY] = detector.modelComplexity
+        self.header[DETECTION_CON] = round(detector.detectionCon * FIXED_POINT)
+        self.header[TRACK_CON] = round(detector.trackCon * FIXED_POINT)
+        self.header[INFERENCE_SCALE] = round(detector.inferenceScale * FIXED_POINT)
+        self.header[WIDTH] = width
+        self.header[HEIGHT] = height
+        self.header[MAX_HANDS] = self.maxHands
+
+    def publish(self, img, results, timestamp = None):
+        """Write one frame and its landmarks; timestamp is the capture time in seconds"""
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.shm is None:
+            self._create(img.shape[1], img.shape[0])
+        hands = results.multi_hand_landmarks or []
+        labels = results.multi_handedness or []
+        numHands = min(len(hands), self.maxHands)
+
+        self.header[SEQ] = self.seq + 1  # odd: write in progress
+        for i in range(numHands):
+            for j, lm in enumerate(hands[i].landmark):
+                self.landmarks[i, j] = (lm.x, lm.y, lm.z)
+            if i < len(labels):
+                cls = labels[i].classification[0]
+                self.handedness[i] = (1.0 if cls.label == 'Right' else 0.0, cls.score)
+        np.copyto(self.frame, img)
+        self.header[NUM_HANDS] = numHands
+        self.header[TIMESTAMP] = int(timestamp * 1e9)
+        self.seq += 2
+        self.header[SEQ] = self.seq  # even: complete
+
+    def run(self, frames = 0):
+        print(f"Publishing hand tracking on shared memory '{self.name}'. Press Ctrl+C to stop.")
+        count = 0
+        try:
+            while True:
+                success, img = self.pool.read(self.cap)
+                captured = time.time()  # before inference, so clients see capture times
+                if not success:
+                    print("Failed to read from camera")
+                    break
+                self.detector.findHands(img, draw=False)
+                self.publish(img, self.detector.results, captured)
+                count += 1
+                if frames and count >= frames:
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self.cap.release()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class HandClient():
+    """
+    Reads frames and landmarks published by HandTrackingDaemon.
+    read() has the same shape as cv.VideoCapture.read(), so an app can use
+    the client as its capture device.
+    """
+    def __init__(self, name = DEFAULT_NAME, timeout = 5.0):
+        self.name = name
+        self.timeout = timeout
+        deadline = time.time() + timeout
+        while True:
+            try:
+                self.shm = _attach(name)
+                header = np.ndarray((HEADER_FIELDS,), np.int64, self.shm.buf, 0)
+                width, height, maxHands = int(header[WIDTH]), int(header[HEIGHT]), int(header[MAX_HANDS])
+                # The daemon's detector settings, for RemoteHandDetector
+                self.settings = {'mode': bool(header[MODE]),
+                                 'modelComplexity': int(header[MODEL_COMPLEXITY]),
+                                 'detectionCon': header[DETECTION_CON] / FIXED_POINT,
+                                 'trackCon': header[TRACK_CON] / FIXED_POINT,
+                                 'inferenceScale': header[INFERENCE_SCALE] / FIXED_POINT}
+                del header
+                if width > 0:
+                    break
+                self.shm.close()
+            except (FileNotFoundError, ValueError):
+                # Not created yet, or created but not sized yet
+                pass
+            if time.time() > deadline:
+                raise RuntimeError(f"No hand tracking daemon publishing on '{name}'")
+            time.sleep(0.05)
+
+        self._header, self._landmarks, self._handedness, self._frame = _views(self.shm.buf, width, height, maxHands)
+        self.frame = np.empty_like(self._frame)
+        self.landmarks = np.zeros_like(self._landmarks)
+        self.handedness = np.zeros_like(self._handedness)
+        self.numHands = 0
+        self.timestamp = 0.0
+        self.seq = 0
+        self.missed = 0  # frames published while this client was busy
+
+    def read(self, image = None):
+        """Wait for the next published frame; returns (success, frame)"""
+        deadline = time.time() + self.timeout
+        while True:
+            seq = int(self._header[SEQ])
+            if seq % 2 == 0 and seq > self.seq:
+                np.copyto(self.frame, self._frame)
+                np.copyto(self.landmarks, self._landmarks)
+                np.copyto(self.handedness, self._handedness)
+                numHands = int(self._header[NUM_HANDS])
+                timestamp = self._header[TIMESTAMP] / 1e9
+                if int(self._header[SEQ]) == seq:
+                    if self.seq:
+                        self.missed += (seq - self.seq) // 2 - 1
+                    self.seq = seq
+                    self.numHands = numHands
+                    self.timestamp = timestamp
+                    return True, self.frame
+                continue  # torn read, try again
+            if time.time() > deadline:
+                return False, None
+            time.sleep(0.001)
+
+    def get(self, propId):
+        """Frame width and height, like cv.VideoCapture.get(); other properties read as 0"""
+        if propId == cv.CAP_PROP_FRAME_WIDTH:
+            return float(self.frame.shape[1])
+        if propId == cv.CAP_PROP_FRAME_HEIGHT:
+            return float(self.frame.shape[0])
+        return 0.0
+
+    def set(self, propId, value):
+        # The daemon owns the camera settings
+        return False
+
+    def release(self):
+        if self.shm is not None:
+            self._header = self._landmarks = self._handedness = self._frame = None
+            self.shm.close()
+            self.shm = None
+
+
+class RemoteHandDetector(htm.handDetector):
+    """
+    handDetector that takes its results from a HandClient instead of running
+    MediaPipe. Set flip=True when the app mirrors frames with cv.flip(img, 1)
+    before calling findHands, so the landmarks are mirrored to match.
+    It doesn't call handDetector.__init__, which would build a MediaPipe
+    graph; the settings it would set come from the daemon instead, so
+    inherited methods such as settingsKey() describe the daemon's detector.
+    """
+    def __init__(self, client, flip = False, smoothing = None, pool = None):
+        self.client = client
+        self.flip = flip
+        self.maxHands = client.landmarks.shape[0]
+        self.mode = client.settings['mode']
+        self.detectionCon = client.settings['detectionCon']
+        self.trackCon = client.settings['trackCon']
+        self.modelComplexity = client.settings['modelComplexity']
+        self.inferenceScale = client.settings['inferenceScale']
+        self.pool = pool if pool is not None else FramePool()
+        self.mpHands = htm.mp.solutions.hands
+        self.hands = None  # no local MediaPipe graph
+        self.motionGate = None  # gating happens in the daemon
+        self.ranInference = True
+        # Each client smooths for itself, with the daemon's frame timestamps
+        self.smoothing = smoothing
+        self.smoothed = None
+        self.results = SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+
+    def configure(self, maxHands = None, modelComplexity = None, inferenceScale = None):
+        # The daemon decides how inference runs
+        pass
+
+    def findHands(self, img, draw = True, timestamp = None):
+        client = self.client
+        hands = []
+        labels = []
+        for i in range(client.numHands):
+            points = client.landmarks[i]
+            label, score = client.handedness[i]
+            if self.flip:
+                landmark = [SimpleNamespace(x=1.0 - x, y=y, z=z) for x, y, z in points.tolist()]
+                label = 1.0 - label
+            else:
+                landmark = [SimpleNamespace(x=x, y=y, z=z) for x, y, z in points.tolist()]
+            hands.append(SimpleNamespace(landmark=landmark))
+            cls = SimpleNamespace(label='Right' if label > 0.5 else 'Left', score=float(score), index=int(label > 0.5))
+            labels.append(SimpleNamespace(classification=[cls]))
+        self.results = SimpleNamespace(multi_hand_landmarks=hands or None,
+                                       multi_handedness=labels or None)
+        if self.smoothing is not None:
+            landmarks = client.landmarks[:client.numHands].copy()
+            if self.flip:
+                landmarks[..., 0] = 1.0 - landmarks[..., 0]
+            self.smoothLandmarks(landmarks, client.timestamp if timestamp is None else timestamp)
+        if draw:
+            h, w = img.shape[:2]
+            for hand in hands:
+                pts = [(int(lm.x * w), int(lm.y * h)) for lm in hand.landmark]
+                for a, b in self.mpHands.HAND_CONNECTIONS:
+                    cv.line(img, pts[a], pts[b], (255, 255, 255), 2)
+                for pt in pts:
+                    cv.circle(img, pt, 4, (0, 0, 255), cv.FILLED)
+        return img
+
+
+def addSourceArgs(parser):
+    parser.add_argument('--daemon', nargs='?', const=DEFAULT_NAME, default=None, metavar='NAME',
+                        help="read frames and landmarks from a running HandTrackingDaemon instead of the camera")
+    parser.add_argument('--no-motion-gate', action='store_true',
+                        help="run hand detection on every frame, even when nothing moves")
+    parser.add_argument('--no-smoothing', action='store_true',
+                        help="use raw landmarks instead of One-Euro filtered ones")
+
+
+def openSource(args, wCam, hCam, pool, flip = False, **detectorArgs):
+    """Return (cap, detector): the local camera + handDetector, or a daemon client"""
+    smoothing = None if args.no_smoothing else htm.OneEuroFilterBank(maxHands=detectorArgs.get('maxHands', 2))
+    if args.daemon:
+        client = HandClient(args.daemon)
+        return client, RemoteHandDetector(client, flip=flip, smoothing=smoothing, pool=pool)
+    cap = cv.VideoCapture(0)
+    cap.set(3, wCam)
+    cap.set(4, hCam)
+    motionGate = None if args.no_motion_gate else htm.MotionGate()
+    return cap, htm.handDetector(pool=pool, motionGate=motionGate, smoothing=smoothing, **detectorArgs)
+
+
+def captureTime(cap):
+    """When the frame just read was captured: the daemon's timestamp, or now for a local camera"""
+    return cap.timestamp if isinstance(cap, HandClient) else time.time()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared hand tracking daemon")
+    parser.add_argument('--name', default=DEFAULT_NAME, help="shared memory segment name")
+    parser.add_argument('--camera', type=int, default=0)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--max-hands', type=int, default=2)
+    parser.add_argument('--detection-con', type=float, default=0.75)
+    parser.add_argument('--no-motion-gate', action='store_true',
+                        help="run hand detection on every frame, even when nothing moves")
+    parser.add_argument('--frames', type=int, default=0, help="stop after this many frames (0 = run until Ctrl+C)")
+    args = parser.parse_args()
+
+    motionGate = None if args.no_motion_gate else htm.MotionGate()
+    daemon = HandTrackingDaemon(args.name, args.camera, args.width, args.height,
+                                maxHands=args.max_hands, detectionCon=args.detection_con,
+                                motionGate=motionGate)
+    daemon.run(args.frames)
+    if motionGate:
+        print(f"Motion gate: {motionGate.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,256 @@
 import cv2 as cv
 import mediapipe as mp
+import numpy as np
 import time
 import math
+from FramePoolModule import FramePool
+
+
+class MotionGate():
+    """
+    Cheap check in front of hand detection for scenes nobody is moving in.
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+    previous one; while nothing changes and no hand is being tracked,
+    inference can be skipped. The frame that shows motion is never skipped,
+    so the detector wakes up on the same frame.
+    """
+    def __init__(self, size = (32, 24), pixelThreshold = 12, minPixels = 2, maxSkip = 15):
+        self.size = size
+        self.pixelThreshold = pixelThreshold  # gray level change that counts as motion
+        self.minPixels = minPixels            # thumbnail pixels that must change
+        # Run inference at least every maxSkip frames anyway, to catch a hand
+        # that appeared without triggering the diff (0 = never force)
+        self.maxSkip = maxSkip
+        self.prev = None
+        self.flip = False
+        self.skipped = 0
+        self.frames = 0
+        self.gatedFrames = 0
+
+    def motion(self, img, pool):
+        """True if img differs from the previous frame passed in"""
+        w, h = self.size
+        small = cv.resize(img, self.size, dst=pool.get('gate_small', (h, w, 3)), interpolation=cv.INTER_AREA)
+        # Alternate between two gray buffers so the previous frame survives
+        self.flip = not self.flip
+        gray = cv.cvtColor(small, cv.COLOR_BGR2GRAY, dst=pool.get(f'gate_gray_{int(self.flip)}', (h, w)))
+        prev, self.prev = self.prev, gray
+        if prev is None:
+            return True
+        diff = cv.absdiff(gray, prev, dst=pool.get('gate_diff', (h, w)))
+        cv.threshold(diff, self.pixelThreshold, 255, cv.THRESH_BINARY, dst=diff)
+        return cv.countNonZero(diff) >= self.minPixels
+
+    def shouldRun(self, img, pool, tracking):
+        """Whether to run inference on img; tracking = hands were found last frame"""
+        self.frames += 1
+        moved = self.motion(img, pool)
+        if tracking or moved or (self.maxSkip and self.skipped >= self.maxSkip):
+            self.skipped = 0
+            return True
+        self.skipped += 1
+        self.gatedFrames += 1
+        return False
+
+    def stats(self):
+        percent = 100 * self.gatedFrames / self.frames if self.frames else 0
+        return f"{self.gatedFrames}/{self.frames} frames gated ({percent:.0f}%)"
+
+
+class OneEuroFilterBank():
+    """
+    One-Euro filter for every landmark of every tracked hand at once.
+
+    Landmarks are (hands, 21, 3) arrays in MediaPipe's normalized
+    coordinates, and each frame is filtered in a single set of NumPy
+    operations. The cutoff frequency rises with landmark speed: slow
+    movements are smoothed hard (no jitter), fast ones barely (no lag).
+    Filtering uses real frame timestamps, so it behaves the same at any
+    frame rate. Each hand gets its own track; a track starts fresh when its
+    hand appears, disappears, or has not been seen for resetAfter seconds.
+    """
+    def __init__(self, minCutoff = 1.0, beta = 10.0, dCutoff = 1.0, resetAfter = 0.5, maxHands = 2):
+        self.minCutoff = minCutoff  # Hz; lower = steadier when still
+        self.beta = beta            # how fast the cutoff rises with speed (per normalized unit/s)
+        self.dCutoff = dCutoff      # Hz, for the speed estimate
+        self.resetAfter = resetAfter
+        self._allocate(maxHands)
+
+    def _allocate(self, slots):
+        self.x = np.zeros((slots, 21, 3), np.float32)    # filtered positions
+        self.dx = np.zeros((slots, 21, 3), np.float32)   # filtered velocities
+        self.t = np.zeros(slots)
+        self.active = np.zeros(slots, bool)
+
+    def reset(self):
+        self.active[:] = False
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def _assign(self, wrists):
+        """Match hands to existing tracks by nearest wrist; returns slot per hand and whether it is new"""
+        n = len(wrists)
+        if n > len(self.active):
+            # More hands than slots (e.g. maxHands raised): grow, keeping tracks
+            x, dx, t, active = self.x, self.dx, self.t, self.active
+            self._allocate(n)
+            k = len(active)
+            self.x[:k], self.dx[:k], self.t[:k], self.active[:k] = x, dx, t, active
+        slots = np.full(n, -1)
+        tracks = np.flatnonzero(self.active)
+        if len(tracks):
+            dist = np.linalg.norm(wrists[:, None, :] - self.x[tracks, 0, :2][None, :, :], axis=2)
+            for _ in range(min(n, len(tracks))):
+                i, j = np.unravel_index(np.argmin(dist), dist.shape)
+                slots[i] = tracks[j]
+                dist[i, :] = np.inf
+                dist[:, j] = np.inf
+        # Unmatched hands take the remaining slots, idle ones first
+        used = set(slots.tolist())
+        free = sorted((s for s in range(len(self.active)) if s not in used), key=lambda s: self.active[s])
+        new = slots < 0
+        slots[new] = free[:int(new.sum())]
+        return slots, new
+
+    def update(self, landmarks, timestamp):
+        """Filter a (hands, 21, 3) array taken at timestamp (seconds); returns the filtered array"""
+        landmarks = np.asarray(landmarks, np.float32)
+        n = len(landmarks)
+        if n == 0:
+            self.reset()
+            return landmarks
+
+        slots, new = self._assign(landmarks[:, 0, :2])
+        dt = timestamp - self.t[slots]
+        new |= ~self.active[slots] | (dt > self.resetAfter)
+        dt = np.maximum(dt, 1e-3)[:, None, None]
+
+        xPrev = self.x[slots]
+        dxRaw = (landmarks - xPrev) / dt
+        aD = self._alpha(self.dCutoff, dt)
+        dxHat = aD * dxRaw + (1 - aD) * self.dx[slots]
+        speed = np.linalg.norm(dxHat[..., :2], axis=2, keepdims=True)
+        a = self._alpha(self.minCutoff + self.beta * speed, dt)
+        xHat = a * landmarks + (1 - a) * xPrev
+
+        # New tracks start from the raw landmarks, at rest
+        xHat[new] = landmarks[new]
+        dxHat[new] = 0
+
+        self.active[:] = False
+        self.active[slots] = True
+        self.x[slots] = xHat
+        self.dx[slots] = dxHat
+        self.t[slots] = timestamp
+        return xHat
+
 
 class handDetector():
-    def __init__(self,mode = False,maxHands = 2, detectionCon = 0.5,trackCon = 0.5):
+    def __init__(self,mode = False,maxHands = 2, detectionCon = 0.5,trackCon = 0.5, pool = None,
+                 modelComplexity = 1, inferenceScale = 1.0, motionGate = None, smoothing = None):
         self.mode = mode
         self.maxHands = maxHands
         self.detectionCon = detectionCon
         self.trackCon = trackCon
+        self.modelComplexity = modelComplexity
+        # Frames are shrunk by this factor before inference; landmarks are
+        # normalized so findPosition still maps them onto the full image
+        self.inferenceScale = inferenceScale
+        # Shared with the app so the RGB conversion buffer is reused every frame
+        self.pool = pool if pool is not None else FramePool()
+        # Optional MotionGate: skip inference while the scene is static
+        self.motionGate = motionGate
+        # Optional OneEuroFilterBank: findPosition then returns steadied landmarks
+        self.smoothing = smoothing
+        self.smoothed = None
+        self.results = None
+        self.ranInference = False  # False when the motion gate skipped the last frame
 
         self.mpHands = mp.solutions.hands
-        self.hands = self.mpHands.Hands(static_image_mode= self.mode,
-                                        max_num_hands=self.maxHands,
-                                        min_detection_confidence=self.detectionCon,
-                                        min_tracking_confidence= self.trackCon)
+        self.hands = self._createHands()
         self.mpDraw = mp.solutions.drawing_utils
 
-    def findHands(self,img,draw = True):
-        imgRGB = cv.cvtColor(img,cv.COLOR_BGR2RGB)
+    def _createHands(self):
+        return self.mpHands.Hands(static_image_mode= self.mode,
+                                  max_num_hands=self.maxHands,
+                                  model_complexity=self.modelComplexity,
+                                  min_detection_confidence=self.detectionCon,
+                                  min_tracking_confidence= self.trackCon)
+
+    def configure(self, maxHands = None, modelComplexity = None, inferenceScale = None):
+        """
+        Change detector settings at runtime.
+        MediaPipe fixes maxHands and model complexity when the graph is built,
+        so changing either one rebuilds it; the inference scale is free to change.
+        """
+        if inferenceScale is not None:
+            self.inferenceScale = inferenceScale
+        rebuild = False
+        if maxHands is not None and maxHands != self.maxHands:
+            self.maxHands = maxHands
+            rebuild = True
+        if modelComplexity is not None and modelComplexity != self.modelComplexity:
+            self.modelComplexity = modelComplexity
+            rebuild = True
+        if rebuild:
+            self.hands.close()
+            self.hands = self._createHands()
+
+    def settingsKey(self):
+        """Everything that can change what the detector returns for an image"""
+        return (f"mode={int(self.mode)};hands={self.maxHands};det={self.detectionCon};"
+                f"track={self.trackCon};model={self.modelComplexity};scale={self.inferenceScale}")
+
+    def findHands(self,img,draw = True, timestamp = None):
+        if self.motionGate is not None and self.results is not None:
+            tracking = bool(self.results.multi_hand_landmarks)
+            if not self.motionGate.shouldRun(img, self.pool, tracking):
+                # Static scene: the last result ("no hand") still holds
+                self.ranInference = False
+                return img
+        self.ranInference = True
+        imgIn = img
+        if self.inferenceScale < 1.0:
+            h, w = img.shape[:2]
+            size = (max(1, int(w * self.inferenceScale)), max(1, int(h * self.inferenceScale)))
+            imgIn = cv.resize(img, size, dst=self.pool.get('small', (size[1], size[0], 3)),
+                              interpolation=cv.INTER_AREA)
+        imgRGB = cv.cvtColor(imgIn,cv.COLOR_BGR2RGB, dst=self.pool.get('rgb', imgIn.shape))
         self.results = self.hands.process(imgRGB)
         if self.results.multi_hand_landmarks:
             for handLM in self.results.multi_hand_landmarks:
                 if draw:
                     self.mpDraw.draw_landmarks(img,handLM,self.mpHands.HAND_CONNECTIONS)
 
+        if self.smoothing is not None:
+            hands = self.results.multi_hand_landmarks or []
+            landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in hands],
+                                 np.float32).reshape(-1, 21, 3)
+            self.smoothLandmarks(landmarks, timestamp)
+
         return img
 
+    def smoothLandmarks(self, landmarks, timestamp = None):
+        """Run a (hands, 21, 3) normalized landmark array through the filter bank"""
+        timestamp = time.time() if timestamp is None else timestamp
+        if len(landmarks):
+            self.smoothed = self.smoothing.update(landmarks, timestamp)
+        else:
+            self.smoothing.reset()
+            self.smoothed = None
+
     def findPosition(self,img, handNo =0):
         lmList = []
+        if self.smoothing is not None:
+            if self.smoothed is not None and handNo < len(self.smoothed):
+                h, w = img.shape[:2]
+                xs = (self.smoothed[handNo, :, 0] * w).astype(int).tolist()
+                ys = (self.smoothed[handNo, :, 1] * h).astype(int).tolist()
+                lmList = [[id, x, y] for id, (x, y) in enumerate(zip(xs, ys))]
+            return lmList
         if self.results.multi_hand_landmarks:
             if handNo < len(self.results.multi_hand_landmarks):
                 myHand = self.results.multi_hand_landmarks[handNo]
@@ -48,47 +270,64 @@ class handDetector():
         Returns list of 0s and 1s for each finger (0=down, 1=up)
         Order: [Thumb, Index, Middle, Ring, Pinky]
         """
-        fingers = []
         lmList = self.findPosition(img,handNo= handNo)
+        return fingersUp(lmList)
+
+
+def fingersUp(lmList):
+    """
+    Finger states from a findPosition() landmark list, so recorded or
+    synthetic landmarks can be classified without running the detector.
+    Returns list of 0s and 1s [Thumb, Index, Middle, Ring, Pinky], or None
+    """
+    fingers = []
+
+    # Check if hand landmarks are available
+    if len(lmList) == 0:
+        return None
+
+    # Finger tip and PIP landmark IDs
+    tipIds = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky tips
+    pipIds = [3, 6, 10, 14, 18]  # PIP joints for comparison
+    
+    try:
+        # Thumb - Special case (compare x-coordinate)
+        if lmList[tipIds[0]][1] > lmList[tipIds[0] - 1][1]:  # Thumb tip vs thumb IP joint
+            fingers.append(1)
+        else:
+            fingers.append(0)
         
-        # Check if hand landmarks are available
-        if len(lmList) == 0:
-            return None
-            
-        # Finger tip and PIP landmark IDs
-        tipIds = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky tips
-        pipIds = [3, 6, 10, 14, 18]  # PIP joints for comparison
-        
-        try:
-            # Thumb - Special case (compare x-coordinate)
-            if lmList[tipIds[0]][1] > lmList[tipIds[0] - 1][1]:  # Thumb tip vs thumb IP joint
+        # Other 4 fingers - Compare y-coordinates (tip vs PIP)
+        for i in range(1, 5):
+            if lmList[tipIds[i]][2] < lmList[pipIds[i]][2]:  # Tip above PIP joint
                 fingers.append(1)
             else:
                 fingers.append(0)
-            
-            # Other 4 fingers - Compare y-coordinates (tip vs PIP)
-            for i in range(1, 5):
-                if lmList[tipIds[i]][2] < lmList[pipIds[i]][2]:  # Tip above PIP joint
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
-                    
-        except IndexError:
-            return None
-            
-        return fingers
+                
+    except IndexError:
+        return None
+        
+    return fingers
 
 
 def main():
+    import argparse
+    import OutputModule as om
+    parser = argparse.ArgumentParser(description="Hand tracking demo")
+    om.addOutputArgs(parser)
+    args = parser.parse_args()
+
     pTime = 0
+    frameCount = 0
     cap = cv.VideoCapture(0)
     detector = handDetector()
+    sink = om.createSink(args.output, 'Hand Tracking', detector.pool)
     
     print("Hand Tracking Started. Press 'ESC' to exit.")
     print("Show your hand to the camera to see finger detection.")
     
     while True:
-        success, img = cap.read()
+        success, img = detector.pool.read(cap)
         if not success:
             print("Failed to read from camera")
             break
@@ -112,15 +351,17 @@ def main():
         pTime = cTime
 
         cv.putText(img, f'FPS: {int(fps)}', (10, 70), cv.FONT_HERSHEY_PLAIN, 2, (255, 0, 255), 3)
-        cv.imshow('Hand Tracking', img)
+        k = sink.show(img)
+        frameCount += 1
+        if args.frames and frameCount >= args.frames:
+            break
         
         # Exit on ESC key
-        k = cv.waitKey(1) & 0xFF
         if k == 27:  # ESC key
             break
 
     cap.release()
-    cv.destroyAllWindows()
+    sink.release()
     print("Hand tracking stopped.")
 
 
@@ -0,0 +1,202 @@
+"""
+On-disk landmark cache for batch processing of still images.
+
+Results are keyed by a hash of the image file's bytes plus the detector
+settings, so re-running an extraction over a mostly unchanged folder only
+costs hashing: images are decoded and run through MediaPipe only on a miss.
+The cache is a single SQLite file with least-recently-used eviction once it
+grows past its size limit.
+
+    python LandmarkCacheModule.py photos/ --out landmarks.json
+"""
+import cv2 as cv
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import argparse
+import HandTrackingModule as htm
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def imageHash(path, chunkSize = 1 << 20):
+    """Content hash of an image file (raw bytes, so no decoding needed)"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunkSize)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extractHands(results):
+    """Detector results as plain data: [{'handedness', 'score', 'landmarks': [[x, y, z] * 21]}]"""
+    hands = []
+    if results.multi_hand_landmarks:
+        labels = results.multi_handedness or []
+        for i, handLM in enumerate(results.multi_hand_landmarks):
+            hand = {'landmarks': [[lm.x, lm.y, lm.z] for lm in handLM.landmark]}
+            if i < len(labels):
+                cls = labels[i].classification[0]
+                hand['handedness'] = cls.label
+                hand['score'] = cls.score
+            hands.append(hand)
+    return hands
+
+
+class LandmarkCache():
+    """
+    SQLite-backed key -> landmarks store, bounded to maxBytes with LRU eviction.
+    maxBytes limits the stored keys and landmark data; the file itself is a
+    little larger because of the index and page overhead.
+    """
+    def __init__(self, path = 'landmark_cache.sqlite', maxBytes = 256 * 1024 * 1024):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path)
+        # Let evicted rows give their pages back to the file system; switching
+        # an existing file over takes one full VACUUM
+        if self.db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.db.execute("VACUUM")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS landmarks (
+                               key TEXT PRIMARY KEY,
+                               value TEXT NOT NULL,
+                               size INTEGER NOT NULL,
+                               last_used REAL NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS landmarks_lru ON landmarks (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def makeKey(contentHash, settings):
+        return f"{contentHash}|{settings}"
+
+    def getMany(self, keys, chunkSize = 500):
+        """
+        Look up many keys at once; returns {key: hands} for the ones present.
+        Duplicate keys count once towards hits and misses.
+        """
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        for i in range(0, len(keys), chunkSize):
+            chunk = keys[i:i + chunkSize]
+            marks = ','.join('?' * len(chunk))
+            rows = self.db.execute(f"SELECT key, value FROM landmarks WHERE key IN ({marks})", chunk)
+            for key, value in rows:
+                found[key] = json.loads(value)
+        if found:
+            now = time.time()
+            self.db.executemany("UPDATE landmarks SET last_used = ? WHERE key = ?",
+                                [(now, key) for key in found])
+            self.db.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def putMany(self, items):
+        """Store {key: hands}, then evict least recently used entries if over the limit"""
+        now = time.time()
+        rows = []
+        for key, hands in items.items():
+            value = json.dumps(hands, separators=(',', ':'))
+            rows.append((key, value, len(value) + len(key), now))
+        self.db.executemany("INSERT OR REPLACE INTO landmarks VALUES (?, ?, ?, ?)", rows)
+        self.evict()
+        self.db.commit()
+
+    def size(self):
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM landmarks").fetchone()[0]
+
+    def evict(self):
+        excess = self.size() - self.maxBytes
+        if excess <= 0:
+            return 0
+        # Walk from the oldest entry until enough bytes are freed
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM landmarks ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.db.executemany("DELETE FROM landmarks WHERE key = ?", victims)
+        self.db.commit()
+        # executescript steps the pragma to completion; execute() would free one page
+        self.db.executescript("PRAGMA incremental_vacuum;")
+        return len(victims)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def processImages(paths, detector, cache, batchSize = 64):
+    """
+    Yield (path, hands) for every image, running the detector only for
+    images whose content + detector settings aren't in the cache yet.
+    """
+    settings = detector.settingsKey()
+    paths = list(paths)
+    for i in range(0, len(paths), batchSize):
+        batch = paths[i:i + batchSize]
+        keys = [LandmarkCache.makeKey(imageHash(path), settings) for path in batch]
+        cached = cache.getMany(keys)
+        computed = {}
+        for path, key in zip(batch, keys):
+            if key in cached or key in computed:
+                continue
+            img = cv.imread(path)
+            if img is None:
+                computed[key] = None
+                continue
+            detector.findHands(img, draw=False)
+            computed[key] = extractHands(detector.results)
+        # Unreadable images are remembered too, so they aren't retried every run
+        if computed:
+            cache.putMany(computed)
+        for path, key in zip(batch, keys):
+            yield path, cached[key] if key in cached else computed[key]
+
+
+def findImages(folder):
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract hand landmarks from a folder of images, with caching")
+    parser.add_argument('folder')
+    parser.add_argument('--out', default='landmarks.json', help="output JSON file")
+    parser.add_argument('--cache', default='landmark_cache.sqlite', help="cache database path")
+    parser.add_argument('--cache-mb', type=float, default=256, help="cache size limit in MB")
+    parser.add_argument('--max-hands', type=int, default=2)
+    parser.add_argument('--detection-con', type=float, default=0.5)
+    args = parser.parse_args()
+
+    detector = htm.handDetector(mode=True, maxHands=args.max_hands, detectionCon=args.detection_con)
+    cache = LandmarkCache(args.cache, int(args.cache_mb * 1024 * 1024))
+    start = time.time()
+    results = {}
+    for path, hands in processImages(findImages(args.folder), detector, cache):
+        results[os.path.relpath(path, args.folder)] = hands
+    cache.close()
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f)
+    elapsed = time.time() - start
+    # Each distinct image counts once, so with duplicates these add up to
+    # fewer than the total; processed = decoded and run through the detector
+    print(f"{len(results)} images in {elapsed:.1f}s: {cache.misses} processed, {cache.hits} from the cache")
+    print(f"Landmarks saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
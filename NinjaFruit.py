@@ -1,17 +1,16 @@
 import cv2
 import time
 import random
-import HandTrackingModule as htm
 import numpy as np
 import json
 import os
+import argparse
+import OutputModule as om
+from FramePoolModule import FramePool
+import QualityControlModule as qcm
+import HandTrackingDaemon as htd
 
 wCam, hCam = 640, 480
-cap = cv2.VideoCapture(0)
-cap.set(3, wCam)
-cap.set(4, hCam)
-
-detector = htm.handDetector(detectionCon=0.75)
 
 # Game states
 MENU = 0
@@ -125,7 +124,14 @@ class Bomb:
         return False
 
 class Game:
-    def __init__(self):
+    """
+    Game state and rules, independent of the camera and window.
+    update() advances one frame from the fingertip position, render() draws
+    the current state onto a camera frame. Pass high_score_file=None to
+    keep the high score out of high_score.json (e.g. for benchmarks).
+    """
+    def __init__(self, high_score_file='high_score.json'):
+        self.high_score_file = high_score_file
         self.state = MENU
         self.score = 0
         self.lives = 3
@@ -140,8 +146,8 @@ class Game:
         
     def load_high_score(self):
         try:
-            if os.path.exists('high_score.json'):
-                with open('high_score.json', 'r') as f:
+            if self.high_score_file and os.path.exists(self.high_score_file):
+                with open(self.high_score_file, 'r') as f:
                     data = json.load(f)
                     return data.get('high_score', 0)
         except:
@@ -149,8 +155,10 @@ class Game:
         return 0
     
     def save_high_score(self):
+        if not self.high_score_file:
+            return
         try:
-            with open('high_score.json', 'w') as f:
+            with open(self.high_score_file, 'w') as f:
                 json.dump({'high_score': self.high_score}, f)
         except:
             pass
@@ -195,10 +203,8 @@ class Game:
         return False
     
     def draw_menu(self, img):
-        # Dark overlay
-        overlay = img.copy()
-        cv2.rectangle(overlay, (0, 0), (wCam, hCam), (0, 0, 0), cv2.FILLED)
-        img = cv2.addWeighted(img, 0.3, overlay, 0.7, 0)
+        # Dark overlay (30% of the frame blended over black, done in place)
+        cv2.convertScaleAbs(img, dst=img, alpha=0.3)
         
         # Title
         cv2.putText(img, "NINJA FRUIT", (wCam//2 - 150, 150), 
@@ -219,10 +225,8 @@ class Game:
         return img
     
     def draw_game_over(self, img):
-        # Dark overlay
-        overlay = img.copy()
-        cv2.rectangle(overlay, (0, 0), (wCam, hCam), (0, 0, 0), cv2.FILLED)
-        img = cv2.addWeighted(img, 0.3, overlay, 0.7, 0)
+        # Dark overlay (30% of the frame blended over black, done in place)
+        cv2.convertScaleAbs(img, dst=img, alpha=0.3)
         
         # Game Over
         cv2.putText(img, "GAME OVER", (wCam//2 - 120, 150), 
@@ -268,104 +272,161 @@ class Game:
         cv2.putText(img, f'High: {self.high_score}', (wCam - 150, 40), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
 
-# Initialize game
-game = Game()
-pTime = 0
-
-while True:
-    success, img = cap.read()
-    img = cv2.flip(img, 1)
-    img = detector.findHands(img, draw=False)
-    lmList = detector.findPosition(img)
-
-    index_tip = None
-    hand_detected = len(lmList) > 8
-    if hand_detected:
-        index_tip = (lmList[8][1], lmList[8][2])
-
-    if game.state == MENU:
-        img = game.draw_menu(img)
-        if hand_detected:
-            game.reset_game()
-    
-    elif game.state == PLAYING:
-        # Draw finger tip
-        if index_tip:
-            cv2.circle(img, index_tip, 15, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, index_tip, 20, (255, 255, 255), 2)
-
-        # Spawn objects
-        game.spawn_objects()
-
-        # Update fruits
-        for fruit in game.fruits[:]:
-            fruit.fall()
-            fruit.draw(img)
-            if index_tip and fruit.check_collision(index_tip):
-                game.score += fruit.points * max(1, game.combo)
-                game.combo += 1
-                game.combo_timer = 60
-                game.fruits_sliced_this_level += 1
-                game.create_particles(fruit.x, fruit.y, fruit.color)
-                
-                # Check for level up
-                if game.check_level_up():
-                    game.score += 50  # Level bonus
-
-        # Update bombs
-        for bomb in game.bombs[:]:
-            bomb.fall()
-            bomb.draw(img)
-            if index_tip and bomb.check_collision(index_tip):
-                game.lives -= 1
-                game.combo = 0
-                game.create_particles(bomb.x, bomb.y, (255, 255, 255), 15)
-
-        # Remove off-screen or sliced objects
-        game.fruits = [f for f in game.fruits if not f.sliced and f.y < hCam + 50]
-        game.bombs = [b for b in game.bombs if not b.sliced and b.y < hCam + 50]
-        
-        # Lose life for missed fruits
-        missed_fruits = [f for f in game.fruits if f.y >= hCam]
-        if missed_fruits:
-            game.lives -= len(missed_fruits)
-        
-        # Update combo timer
-        if game.combo_timer > 0:
-            game.combo_timer -= 1
-        else:
-            game.combo = 0
-
-        # Update particles
-        game.update_particles()
-        for particle in game.particles:
-            particle.draw(img)
-
-        # Draw HUD
-        game.draw_hud(img)
-
-        # Check game over
-        if game.lives <= 0:
-            if game.score > game.high_score:
-                game.high_score = game.score
-                game.save_high_score()
-            game.state = GAME_OVER
-
-    elif game.state == GAME_OVER:
-        img = game.draw_game_over(img)
-        if hand_detected:
-            game.state = MENU
-
-    # FPS Display
-    cTime = time.time()
-    fps = 1 / (cTime - pTime) if pTime != 0 else 0
-    pTime = cTime
-    cv2.putText(img, f'FPS: {int(fps)}', (wCam - 100, hCam - 20), 
-               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-    cv2.imshow("Ninja Fruit Enhanced", img)
-    if cv2.waitKey(1) == 27:  # ESC to exit
-        break
-
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+    def update(self, index_tip):
+        """Advance the game by one frame; index_tip is the fingertip (x, y) or None"""
+        hand_detected = index_tip is not None
+
+        if self.state == MENU:
+            if hand_detected:
+                self.reset_game()
+
+        elif self.state == PLAYING:
+            # Spawn objects
+            self.spawn_objects()
+
+            # Update fruits
+            for fruit in self.fruits[:]:
+                fruit.fall()
+                if index_tip and fruit.check_collision(index_tip):
+                    self.score += fruit.points * max(1, self.combo)
+                    self.combo += 1
+                    self.combo_timer = 60
+                    self.fruits_sliced_this_level += 1
+                    self.create_particles(fruit.x, fruit.y, fruit.color)
+
+                    # Check for level up
+                    if self.check_level_up():
+                        self.score += 50  # Level bonus
+
+            # Update bombs
+            for bomb in self.bombs[:]:
+                bomb.fall()
+                if index_tip and bomb.check_collision(index_tip):
+                    self.lives -= 1
+                    self.combo = 0
+                    self.create_particles(bomb.x, bomb.y, (255, 255, 255), 15)
+
+            # Remove off-screen or sliced objects
+            self.fruits = [f for f in self.fruits if not f.sliced and f.y < hCam + 50]
+            self.bombs = [b for b in self.bombs if not b.sliced and b.y < hCam + 50]
+
+            # Lose life for missed fruits
+            missed_fruits = [f for f in self.fruits if f.y >= hCam]
+            if missed_fruits:
+                self.lives -= len(missed_fruits)
+
+            # Update combo timer
+            if self.combo_timer > 0:
+                self.combo_timer -= 1
+            else:
+                self.combo = 0
+
+            # Update particles
+            self.update_particles()
+
+            # Check game over
+            if self.lives <= 0:
+                if self.score > self.high_score:
+                    self.high_score = self.score
+                    self.save_high_score()
+                self.state = GAME_OVER
+
+        elif self.state == GAME_OVER:
+            if hand_detected:
+                self.state = MENU
+
+    def render(self, img, index_tip=None):
+        """Draw the current state onto img (in place) and return it"""
+        if self.state == MENU:
+            img = self.draw_menu(img)
+
+        elif self.state == PLAYING:
+            # Draw finger tip
+            if index_tip:
+                cv2.circle(img, index_tip, 15, (255, 0, 255), cv2.FILLED)
+                cv2.circle(img, index_tip, 20, (255, 255, 255), 2)
+
+            for fruit in self.fruits:
+                fruit.draw(img)
+            for bomb in self.bombs:
+                bomb.draw(img)
+            for particle in self.particles:
+                particle.draw(img)
+
+            # Draw HUD
+            self.draw_hud(img)
+
+        elif self.state == GAME_OVER:
+            img = self.draw_game_over(img)
+
+        return img
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ninja Fruit")
+    om.addOutputArgs(parser)
+    qcm.addQualityArgs(parser)
+    htd.addSourceArgs(parser)
+    args = parser.parse_args()
+
+    pool = FramePool()
+    cap, detector = htd.openSource(args, wCam, hCam, pool, flip=True, detectionCon=0.75)
+    # With --daemon, inference quality is up to the daemon
+    quality = None if args.daemon else qcm.createController(detector, args.target_ms)
+
+    # Initialize game
+    game = Game()
+    sink = om.createSink(args.output, "Ninja Fruit Enhanced", pool)
+    pTime = 0
+    frameCount = 0
+
+    try:
+        while True:
+            success, frame = pool.read(cap)
+            if not success:
+                break
+            frameTime = htd.captureTime(cap)  # the landmark filter runs on capture times
+            if quality:
+                quality.startFrame()
+            img = cv2.flip(frame, 1, dst=pool.get('flip', frame.shape))
+            img = detector.findHands(img, draw=False, timestamp=frameTime)
+            lmList = detector.findPosition(img)
+
+            index_tip = None
+            if len(lmList) > 8:
+                index_tip = (lmList[8][1], lmList[8][2])
+
+            game.update(index_tip)
+            img = game.render(img, index_tip)
+
+            # FPS Display
+            cTime = time.time()
+            fps = 1 / (cTime - pTime) if pTime != 0 else 0
+            pTime = cTime
+            cv2.putText(img, f'FPS: {int(fps)}', (wCam - 100, hCam - 20), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            if quality:
+                # Frames the motion gate skipped say nothing about inference cost
+                if detector.ranInference:
+                    quality.endFrame()
+                cv2.putText(img, quality.describe(), (10, hCam - 20), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+            key = sink.show(img)
+            frameCount += 1
+            if args.frames and frameCount >= args.frames:
+                break
+            if key == 27:  # ESC to exit
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        sink.release()
+    print(f"Frame pool: {pool.stats()}")
+    if detector.motionGate:
+        print(f"Motion gate: {detector.motionGate.stats()}")
+
+
+if __name__ == "__main__":
+    main()
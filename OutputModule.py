@@ -0,0 +1,275 @@
+import cv2 as cv
+import os
+import threading
+from collections import deque
+import numpy as np
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from FramePoolModule import FramePool
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi')
+
+
+class OutputSink():
+    """
+    Base class for frame outputs.
+    show() mirrors cv.imshow + cv.waitKey: it takes a frame and returns
+    the pressed key code, or -1 when the sink has no keyboard.
+    """
+    def show(self, img):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class WindowSink(OutputSink):
+    """Desktop window output (the original cv.imshow behaviour)"""
+    def __init__(self, title):
+        self.title = title
+
+    def show(self, img):
+        cv.imshow(self.title, img)
+        return cv.waitKey(1) & 0xFF
+
+    def release(self):
+        cv.destroyWindow(self.title)
+
+
+class BackgroundSink(OutputSink):
+    """
+    Hands frames to a worker thread that does the expensive encoding.
+    Up to queueSize frames wait for the worker. When the queue is full,
+    dropFrames=True drops the oldest waiting frame instead of stalling the
+    app (right for live views); dropFrames=False makes show() wait for the
+    worker instead, so no frame is lost (right for recordings).
+    Frames are copied into queueSize + 1 preallocated buffers from the
+    frame pool, so a steady stream of frames allocates nothing.
+    If encode() fails, the worker stops and the error is raised from the
+    next show() or release().
+    """
+    def __init__(self, queueSize=1, dropFrames=True, pool=None):
+        self.queueSize = queueSize
+        self.dropFrames = dropFrames
+        self.pool = pool if pool is not None else FramePool()
+        self.framesWritten = 0
+        self.framesDropped = 0
+        self._free = list(range(queueSize + 1))  # buffers neither queued nor being encoded
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = True
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def show(self, img):
+        with self._cond:
+            self._raiseError()
+            while not self._free:
+                if self.dropFrames:
+                    self._free.append(self._pending.popleft())
+                    self.framesDropped += 1
+                else:
+                    self._cond.wait()
+                    self._raiseError()
+            index = self._free.pop()
+            # Copy so the app can keep drawing into its own buffer
+            np.copyto(self.pool.get(f'output{index}', img.shape, img.dtype), img)
+            self._pending.append(index)
+            self._cond.notify_all()
+        return -1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and self._running:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                index = self._pending.popleft()
+                img = self.pool.buffers[f'output{index}']
+            try:
+                self.encode(img)
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+                    self._running = False
+                    self._pending.clear()
+                    # Wake a show() waiting for a buffer, so it raises instead of hanging
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._free.append(index)
+                self.framesWritten += 1
+                # Wake a show() waiting for a buffer
+                self._cond.notify_all()
+
+    def encode(self, img):
+        raise NotImplementedError
+
+    def _raiseError(self):
+        """Re-raise a worker failure once, in the app's thread"""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def release(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+        self._raiseError()
+
+
+class VideoFileSink(BackgroundSink):
+    """
+    Records frames to a video file (codec chosen from the extension).
+    Every frame is written, so the file plays back at `fps` frame for frame;
+    if the encoder falls behind, show() waits rather than drop frames.
+    """
+    def __init__(self, path, fps=30, queueSize=4, pool=None):
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            raise FileNotFoundError(f"Can't record to {path}: folder {folder} doesn't exist")
+        self.path = path
+        self.fps = fps
+        self.writer = None
+        super().__init__(queueSize, dropFrames=False, pool=pool)
+
+    def encode(self, img):
+        if self.writer is None:
+            h, w = img.shape[:2]
+            codec = 'XVID' if self.path.lower().endswith('.avi') else 'mp4v'
+            self.writer = cv.VideoWriter(self.path, cv.VideoWriter_fourcc(*codec), self.fps, (w, h))
+            if not self.writer.isOpened():
+                raise RuntimeError(f"Could not open {self.path} for writing with the {codec} codec")
+        self.writer.write(img)
+
+    def release(self):
+        try:
+            super().release()
+        finally:
+            if self.writer is not None:
+                self.writer.release()
+
+
+class MJPEGStreamSink(BackgroundSink):
+    """
+    Serves frames as an MJPEG stream over HTTP on localhost.
+    Open http://127.0.0.1:<port>/ in a browser to watch.
+    """
+    def __init__(self, port=8080, host='127.0.0.1', quality=80, pool=None):
+        self.quality = quality
+        self.jpeg = None
+        self.jpegSeq = 0
+        self._frameReady = threading.Condition()
+        super().__init__(pool=pool)
+
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                lastSeq = 0
+                try:
+                    while True:
+                        jpeg, lastSeq = sink.waitForFrame(lastSeq)
+                        if jpeg is None:
+                            break
+                        self.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\n')
+                        self.wfile.write(f'Content-Length: {len(jpeg)}\r\n\r\n'.encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b'\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._serverThread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._serverThread.start()
+
+    def encode(self, img):
+        ok, buf = cv.imencode('.jpg', img, [cv.IMWRITE_JPEG_QUALITY, self.quality])
+        if ok:
+            with self._frameReady:
+                self.jpeg = buf.tobytes()
+                self.jpegSeq += 1
+                self._frameReady.notify_all()
+
+    def waitForFrame(self, lastSeq, timeout=1.0):
+        """Block until a frame newer than lastSeq is encoded"""
+        with self._frameReady:
+            while self.jpegSeq == lastSeq and self._running:
+                self._frameReady.wait(timeout)
+            if not self._running:
+                return None, lastSeq
+            return self.jpeg, self.jpegSeq
+
+    def release(self):
+        try:
+            super().release()
+        finally:
+            with self._frameReady:
+                self._frameReady.notify_all()
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def createSink(output, title, pool=None):
+    """
+    Build a sink from an --output value (background sinks keep their frame
+    copies in `pool`, so pass the app's pool to have them counted in it):
+      window            desktop window (default)
+      mjpeg[:port]      MJPEG stream on http://127.0.0.1:port/
+      <file>.mp4/.avi   record to a video file
+    """
+    if output is None or output == 'window':
+        return WindowSink(title)
+    if output == 'mjpeg' or output.startswith('mjpeg:'):
+        port = int(output.split(':', 1)[1]) if ':' in output else 8080
+        print(f"Streaming to http://127.0.0.1:{port}/")
+        return MJPEGStreamSink(port, pool=pool)
+    if output.lower().endswith(VIDEO_EXTENSIONS):
+        return VideoFileSink(output, pool=pool)
+    raise ValueError(f"Unknown output '{output}': use window, mjpeg[:port] or a .mp4/.avi file")
+
+
+def addOutputArgs(parser):
+    parser.add_argument('--output', default='window',
+                        help="window, mjpeg[:port] or a video file path (.mp4/.avi)")
+    parser.add_argument('--frames', type=int, default=0,
+                        help="stop after this many frames (0 = run until ESC)")
+
+
+def main():
+    # Encode a synthetic pattern through the chosen sink; handy for checking
+    # a headless setup without a camera
+    import argparse
+    parser = argparse.ArgumentParser(description="Output sink self-test")
+    addOutputArgs(parser)
+    args = parser.parse_args()
+
+    sink = createSink(args.output, 'Output Test')
+    frames = args.frames or 300
+    img = np.zeros((480, 640, 3), np.uint8)
+    start = time.time()
+    for i in range(frames):
+        img[:] = 0
+        cv.circle(img, (i * 5 % 640, 240), 40, (0, 255, 255), cv.FILLED)
+        if sink.show(img) == 27:
+            break
+    sink.release()
+    elapsed = time.time() - start
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed:.1f} FPS)")
+    if isinstance(sink, BackgroundSink):
+        print(f"Written: {sink.framesWritten}, dropped: {sink.framesDropped}")
+
+
+if __name__ == "__main__":
+    main()
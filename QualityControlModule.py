@@ -0,0 +1,148 @@
+import time
+
+
+class QualityController():
+    """
+    Keeps the frame time near a target by trading detection quality for speed.
+
+    Only the work the controller can change is timed: detection plus the
+    app's update and render, between startFrame() and endFrame(). Waiting
+    for the camera or the display isn't counted, so a 30 FPS webcam doesn't
+    look like a 33 ms frame that needs degrading.
+    Frames where inference was skipped (see MotionGate) should not be ended
+    either: they cost next to nothing and would read as spare headroom.
+
+    The controller walks a ladder of operating points, from best quality to
+    cheapest: MediaPipe model complexity, inference scale and max hands.
+    It steps down quickly when the smoothed frame time is over budget and
+    steps up slowly when there is plenty of headroom. A step up that has
+    to be undone right away doubles the wait before the next step up, so
+    the settings don't oscillate between two levels.
+    """
+    def __init__(self, detector, targetMs = 33, levels = None, smoothing = 0.1,
+                 downAfter = 10, upAfter = 60, upMargin = 0.7, settleFrames = 15):
+        self.detector = detector
+        self.targetMs = targetMs
+        self.levels = levels if levels is not None else self.defaultLevels(detector)
+        self.smoothing = smoothing
+        self.downAfter = downAfter        # frames over budget before stepping down
+        self.baseUpAfter = upAfter        # frames with headroom before stepping up
+        self.upAfter = upAfter
+        self.upMargin = upMargin          # "headroom" means below targetMs * upMargin
+        self.settleFrames = settleFrames  # ignore frames right after a switch
+
+        self.level = 0
+        self.avgMs = None
+        self.overCount = 0
+        self.underCount = 0
+        self.settle = 0
+        self.framesSinceUp = None
+        self.switches = 0
+        self.frameStart = None
+        self.apply()
+
+    @staticmethod
+    def defaultLevels(detector):
+        """Quality ladder starting from the detector's own settings"""
+        hands = detector.maxHands
+        levels = [
+            (detector.modelComplexity, 1.0, hands),
+            (0, 1.0, hands),
+            (0, 0.75, hands),
+            (0, 0.5, hands),
+            (0, 0.5, 1),
+        ]
+        ladder = []
+        for level in levels:
+            if level not in ladder:
+                ladder.append(level)
+        return ladder
+
+    @property
+    def operatingPoint(self):
+        complexity, scale, hands = self.levels[self.level]
+        return {'level': self.level,
+                'modelComplexity': complexity,
+                'inferenceScale': scale,
+                'maxHands': hands,
+                'frameMs': self.avgMs,
+                'targetMs': self.targetMs}
+
+    def describe(self):
+        complexity, scale, hands = self.levels[self.level]
+        frameMs = f"{self.avgMs:.0f}" if self.avgMs is not None else "-"
+        return f"Q{self.level} model:{complexity} scale:{scale:.2f} hands:{hands} {frameMs}/{self.targetMs}ms"
+
+    def apply(self):
+        complexity, scale, hands = self.levels[self.level]
+        self.detector.configure(maxHands=hands, modelComplexity=complexity, inferenceScale=scale)
+
+    def startFrame(self):
+        """Call once a frame has been captured, before detection"""
+        self.frameStart = time.perf_counter()
+
+    def endFrame(self):
+        """Call after the app has rendered, before showing the frame"""
+        if self.frameStart is not None:
+            self.update((time.perf_counter() - self.frameStart) * 1000)
+            self.frameStart = None
+
+    def update(self, frameMs):
+        """Feed one frame time in milliseconds; returns True if the operating point changed"""
+        if self.framesSinceUp is not None:
+            self.framesSinceUp += 1
+        if self.settle > 0:
+            self.settle -= 1
+            return False
+
+        if self.avgMs is None:
+            self.avgMs = frameMs
+        else:
+            self.avgMs += self.smoothing * (frameMs - self.avgMs)
+
+        if self.avgMs > self.targetMs:
+            self.overCount += 1
+            self.underCount = 0
+        elif self.avgMs < self.targetMs * self.upMargin:
+            self.underCount += 1
+            self.overCount = 0
+        else:
+            self.overCount = 0
+            self.underCount = 0
+
+        if self.overCount >= self.downAfter and self.level < len(self.levels) - 1:
+            # Stepping up didn't hold: back off before trying again
+            if self.framesSinceUp is not None and self.framesSinceUp < self.upAfter:
+                self.upAfter *= 2
+            self.framesSinceUp = None
+            self._switch(self.level + 1)
+            return True
+        if self.underCount >= self.upAfter and self.level > 0:
+            self.framesSinceUp = 0
+            self._switch(self.level - 1)
+            return True
+        if self.framesSinceUp is not None and self.framesSinceUp > 4 * self.upAfter:
+            # The last step up has been stable for a while
+            self.upAfter = self.baseUpAfter
+            self.framesSinceUp = None
+        return False
+
+    def _switch(self, level):
+        self.level = level
+        self.apply()
+        self.switches += 1
+        self.overCount = 0
+        self.underCount = 0
+        self.settle = self.settleFrames
+        # Frame times from the old settings say nothing about the new ones
+        self.avgMs = None
+
+
+def addQualityArgs(parser):
+    parser.add_argument('--target-ms', type=float, default=33,
+                        help="processing time budget per frame for adaptive quality, "
+                             "not counting camera and display waits (0 = fixed quality)")
+
+
+def createController(detector, targetMs):
+    return QualityController(detector, targetMs) if targetMs > 0 else None
@@ -0,0 +1,107 @@
+import cv2 as cv
+import numpy as np
+import math
+
+
+class StrokeBuilder():
+    """
+    Turns timestamped fingertip samples into smooth anti-aliased strokes.
+
+    Consecutive samples are joined with a Catmull-Rom spline whose knots are
+    the sample timestamps, so the curve follows the finger's real speed
+    whatever the detection rate. Each segment is subdivided by its length in
+    pixels, not by frame count, which is what keeps a 15 Hz stroke as round
+    as a 60 Hz one. A segment needs the sample after it, so the canvas lags
+    one sample behind the finger; drawPreview() fills that gap on screen.
+    """
+    def __init__(self, canvas, color = (255, 0, 255), thickness = 15,
+                 smoothingTime = 0.02, maxSegmentPx = 3.0):
+        self.canvas = canvas
+        self.color = color
+        self.thickness = thickness
+        # Time constant of the jitter filter in seconds (0 = off). A time
+        # constant rather than a per-frame factor, so the smoothing stays about
+        # the same at any frame rate; keep it short, since more lag rounds off
+        # low-rate strokes more than high-rate ones.
+        self.smoothingTime = smoothingTime
+        self.maxSegmentPx = maxSegmentPx
+        self.points = []  # samples not yet drawn up to, as (t, x, y)
+        self.previous = None  # sample before points[0], the spline's left neighbour
+
+    @property
+    def active(self):
+        return len(self.points) > 0
+
+    def add(self, x, y, t):
+        """Add a fingertip sample at time t (seconds) and draw what it completes"""
+        if self.points:
+            pt, px, py = self.points[-1]
+            # Drop duplicate timestamps rather than divide by zero
+            if t <= pt:
+                return
+            if self.smoothingTime > 0:
+                alpha = math.exp(-(t - pt) / self.smoothingTime)
+                x = alpha * px + (1 - alpha) * x
+                y = alpha * py + (1 - alpha) * y
+        else:
+            # A tap leaves a dot, like a zero-length line did before
+            cv.circle(self.canvas, (int(x), int(y)), max(1, self.thickness // 2),
+                      self.color, cv.FILLED, cv.LINE_AA)
+
+        self.points.append((t, x, y))
+        if len(self.points) == 3:
+            p1, p2, p3 = self.points
+            self._drawSegment(self.previous or self._extrapolate(p1, p2), p1, p2, p3)
+            self.previous = self.points.pop(0)
+
+    def end(self):
+        """Finish the stroke, drawing the segment that was waiting for a next sample"""
+        if len(self.points) == 2:
+            p1, p2 = self.points
+            self._drawSegment(self.previous or self._extrapolate(p1, p2), p1, p2,
+                              self._extrapolate(p2, p1))
+        self.points = []
+        self.previous = None
+
+    def drawPreview(self, img):
+        """Draw the not-yet-committed tail of the stroke onto img (not the canvas)"""
+        if len(self.points) == 2:
+            (_, x1, y1), (_, x2, y2) = self.points
+            cv.line(img, (int(x1), int(y1)), (int(x2), int(y2)), self.color,
+                    self.thickness, cv.LINE_AA)
+
+    @staticmethod
+    def _extrapolate(p, q):
+        """Phantom point mirroring q through p, in space and time"""
+        return (2 * p[0] - q[0], 2 * p[1] - q[1], 2 * p[2] - q[2])
+
+    def _drawSegment(self, p0, p1, p2, p3):
+        """Draw the spline between p1 and p2, with p0 and p3 as neighbours"""
+        length = math.hypot(p2[1] - p1[1], p2[2] - p1[2])
+        steps = max(1, int(math.ceil(length / self.maxSegmentPx)))
+        curve = catmullRom(p0, p1, p2, p3, steps)
+        # 4 bits of sub-pixel precision keeps short AA segments from wobbling
+        pts = np.round(curve * 16).astype(np.int32)
+        cv.polylines(self.canvas, [pts], False, self.color, self.thickness, cv.LINE_AA, shift=4)
+
+
+def catmullRom(p0, p1, p2, p3, steps):
+    """
+    Points on the Catmull-Rom segment from p1 to p2 (steps + 1 of them).
+    Each p is (t, x, y); t is the knot, so unevenly timed samples bend the
+    curve the way the finger actually moved (Barry-Goldman form).
+    """
+    t0, t1, t2, t3 = p0[0], p1[0], p2[0], p3[0]
+    P0, P1, P2, P3 = (np.array(p[1:], dtype=np.float64) for p in (p0, p1, p2, p3))
+    # Guard against coincident knots
+    eps = 1e-6
+    t0 = min(t0, t1 - eps)
+    t3 = max(t3, t2 + eps)
+
+    t = np.linspace(t1, t2, steps + 1)[:, None]
+    A1 = ((t1 - t) * P0 + (t - t0) * P1) / (t1 - t0)
+    A2 = ((t2 - t) * P1 + (t - t1) * P2) / (t2 - t1)
+    A3 = ((t3 - t) * P2 + (t - t2) * P3) / (t3 - t2)
+    B1 = ((t2 - t) * A1 + (t - t0) * A2) / (t2 - t0)
+    B2 = ((t3 - t) * A2 + (t - t1) * A3) / (t3 - t1)
+    return ((t2 - t) * B1 + (t - t1) * B2) / (t2 - t1)
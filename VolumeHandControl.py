@@ -1,73 +1,136 @@
 import cv2
 import time
 import numpy as np
-import HandTrackingModule as htm
 import math
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+import argparse
+import OutputModule as om
+from FramePoolModule import FramePool
+import QualityControlModule as qcm
+import HandTrackingDaemon as htd
 
 wCam ,  hCam = 640, 480
 
-cap = cv2.VideoCapture(0)
-cap.set(3, wCam)
-cap.set(4, hCam)
-pTime = 0
 
-detector = htm.handDetector(detectionCon=0.75)
+class VolumeControl:
+    """
+    Pinch-to-volume logic, independent of the camera, window and audio API.
+    update() maps the thumb/index distance to a volume level, render() draws
+    the pinch and the volume bar. The runner applies `vol` to the speakers.
+    """
+    def __init__(self, minVol = -65.25, maxVol = 0.0):
+        self.minVol = minVol
+        self.maxVol = maxVol
+        self.vol = maxVol  # the runner starts the speakers at full volume
+        self.pinch = None  # (x1, y1, x2, y2, cx, cy, length) while a hand is visible
 
-devices = AudioUtilities.GetSpeakers()
-interface = devices.Activate(
-    IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-volume = interface.QueryInterface(IAudioEndpointVolume)
-
-volRange = volume.GetVolumeRange()
-volume.SetMasterVolumeLevel(0, None)
-minVol = volRange[0]
-maxVol = volRange[1]
-vol = 0
-# volume.GetMute()
-
-while True:
-    success, img = cap.read()
-    img = detector.findHands(img, draw=False)
-    lmList = detector.findPosition(img)
-    if len(lmList) != 0:
-        print(lmList[4], lmList[8])  # Print the coordinates of the thumb and index finger tips
+    def update(self, lmList):
+        """Returns True when a hand set a new volume this frame"""
+        if len(lmList) == 0:
+            self.pinch = None
+            return False
 
         x1, y1 = lmList[4][1], lmList[4][2]  # Thumb tip coordinates
         x2, y2 = lmList[8][1], lmList[8][2]
         cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
 
-        cv2.circle(img,  (x1, y1), 15, (255, 0, 255), cv2.FILLED) 
-        cv2.circle(img,  (x2, y2), 15, (255, 0, 255), cv2.FILLED)
-        cv2.line(img, (x1, y1) , (x2, y2), (255, 0, 255), 3)
-        cv2.circle(img, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
-
         length = math.hypot(x2-x1, y2-y1)  # Calculate the distance between thumb and index finger tips
-        print(length)
 
         # Hand range 50 - 300
         # Volume range -96 - 0
-        vol = np.interp(length, [50, 280], [minVol, maxVol]) #convert length to volume
-        print(vol)
-        volume.SetMasterVolumeLevel(vol, None) #set volume
-        if length < 50:
-            cv2.circle(img, (cx, cy), 15, (0, 255, 0), cv2.FILLED) #button press effect
-            
+        self.vol = np.interp(length, [50, 280], [self.minVol, self.maxVol]) #convert length to volume
+        self.pinch = (x1, y1, x2, y2, cx, cy, length)
+        return True
+
+    def render(self, img):
+        if self.pinch:
+            x1, y1, x2, y2, cx, cy, length = self.pinch
+            cv2.circle(img,  (x1, y1), 15, (255, 0, 255), cv2.FILLED)
+            cv2.circle(img,  (x2, y2), 15, (255, 0, 255), cv2.FILLED)
+            cv2.line(img, (x1, y1) , (x2, y2), (255, 0, 255), 3)
+            cv2.circle(img, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
+            if length < 50:
+                cv2.circle(img, (cx, cy), 15, (0, 255, 0), cv2.FILLED) #button press effect
+
+        # Draw the volume bar
+        volBar = np.interp(self.vol, [self.minVol, self.maxVol], [400, 150])  # Map volume to bar height
+        volPer = np.interp(self.vol, [self.minVol, self.maxVol], [0, 100])  # Map volume to percentage
+        cv2.rectangle(img, (50, 150), (85, 400), (255, 0, 0), 3)  # Draw the volume bar outline
+        cv2.rectangle(img, (50, int(volBar)), (85, 400), (255, 0, 0), cv2.FILLED)  # Fill the volume bar
+        cv2.putText(img, f'{int(volPer)}%', (40, 450), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 3)  # Display volume percentage
+        return img
+
+
+def main():
+    # pycaw is Windows-only, so keep it out of the importable core
+    from comtypes import CLSCTX_ALL
+    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+
+    parser = argparse.ArgumentParser(description="Volume Hand Control")
+    om.addOutputArgs(parser)
+    qcm.addQualityArgs(parser)
+    htd.addSourceArgs(parser)
+    args = parser.parse_args()
+
+    pTime = 0
+
+    pool = FramePool()
+    cap, detector = htd.openSource(args, wCam, hCam, pool, flip=False, detectionCon=0.75)
+    # With --daemon, inference quality is up to the daemon
+    quality = None if args.daemon else qcm.createController(detector, args.target_ms)
+
+    devices = AudioUtilities.GetSpeakers()
+    interface = devices.Activate(
+        IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+    volume = interface.QueryInterface(IAudioEndpointVolume)
+
+    volRange = volume.GetVolumeRange()
+    volume.SetMasterVolumeLevel(0, None)
+    control = VolumeControl(volRange[0], volRange[1])
+    # volume.GetMute()
+
+    sink = om.createSink(args.output, "Image", pool)
+    frameCount = 0
+
+    try:
+        while True:
+            success, img = pool.read(cap)
+            if not success:
+                break
+            frameTime = htd.captureTime(cap)  # the landmark filter runs on capture times
+            if quality:
+                quality.startFrame()
+            img = detector.findHands(img, draw=False, timestamp=frameTime)
+            lmList = detector.findPosition(img)
+            if control.update(lmList):
+                volume.SetMasterVolumeLevel(control.vol, None) #set volume
+            control.render(img)
 
-    # Draw the volume bar
-    volBar = np.interp(vol, [minVol, maxVol], [400, 150])  # Map volume to bar height
-    volPer = np.interp(vol, [minVol, maxVol], [0, 100])  # Map volume to percentage
-    cv2.rectangle(img, (50, 150), (85, 400), (255, 0, 0), 3)  # Draw the volume bar outline
-    cv2.rectangle(img, (50, int(volBar)), (85, 400), (255, 0, 0), cv2.FILLED)  # Fill the volume bar
-    cv2.putText(img, f'{int(volPer)}%', (40, 450), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 3)  # Display volume percentage
+            cTime = time.time()
+            fps = 1 / (cTime - pTime)
+            pTime = cTime
 
+            cv2.putText(img, f'FPS: {int(fps)}', (40, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 3)
+            if quality:
+                # Frames the motion gate skipped say nothing about inference cost
+                if detector.ranInference:
+                    quality.endFrame()
+                cv2.putText(img, quality.describe(), (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
 
-    cTime = time.time()
-    fps = 1 / (cTime - pTime)
-    pTime = cTime
+            key = sink.show(img)
+            frameCount += 1
+            if args.frames and frameCount >= args.frames:
+                break
+            if key == 27:  # ESC to exit
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        sink.release()
+    print(f"Frame pool: {pool.stats()}")
+    if detector.motionGate:
+        print(f"Motion gate: {detector.motionGate.stats()}")
 
-    cv2.putText(img, f'FPS: {int(fps)}', (40, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 3)
 
-    cv2.imshow("Image", img)
-    cv2.waitKey(1)
\ No newline at end of file
+if __name__ == "__main__":
+    main()